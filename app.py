@@ -1,6 +1,9 @@
-from flask import Flask, request, jsonify, render_template, session, redirect, url_for
+from flask import Flask, Response, request, jsonify, render_template, session, redirect, url_for
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.utils import secure_filename
-from functools import wraps
+from werkzeug.exceptions import HTTPException
+from functools import wraps, lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import udochat
 import planreview
 import psycopg2
@@ -8,9 +11,16 @@ import psycopg2.extras
 from psycopg2 import pool
 from werkzeug.security import check_password_hash, generate_password_hash
 import os
+from types import MappingProxyType
 import datetime
+import logging
+import logging.handlers
+import queue
+import atexit
 import json
+import gzip
 import base64
+import orjson
 import pytesseract
 import cv2
 import numpy as np
@@ -18,78 +28,247 @@ from pdf2image import convert_from_bytes
 from PIL import Image
 
 MAX_LOGIN_ATTEMPTS = 5
+MIN_PASSWORD_LENGTH = 8
+MAX_PDF_SIZE = 10 * 1024 * 1024
+# Allowance for multipart boundaries and form fields around the file
+MAX_UPLOAD_REQUEST_SIZE = MAX_PDF_SIZE + 64 * 1024
+# Default request body limit; only the PDF upload raises it
+MAX_JSON_REQUEST_SIZE = 1 * 1024 * 1024
+COMPRESS_MIN_SIZE = 1024
+# Appended to the ETag of gzipped responses so they don't share a validator with the identity body
+GZIP_ETAG_SUFFIX = '-gzip'
+# Largest page the list endpoints will return when a limit is given
+MAX_PAGE_SIZE = 500
+# to_char() pattern matching datetime.isoformat() for the timestamps list endpoints return
+ISO_TIMESTAMP_FORMAT = 'YYYY-MM-DD"T"HH24:MI:SS.US'
+# Werkzeug hash spec, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000"
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+# Uploads whose OCR is being extracted in the background at once
+OCR_BACKGROUND_WORKERS = int(os.environ.get('OCR_BACKGROUND_WORKERS', 2))
 
+@lru_cache(maxsize=1)
 def is_azure_deployment():
-    """Detect if running in Azure App Service"""
+    """Detect if running in Azure App Service (environment is fixed for the process lifetime)"""
     return (
         os.environ.get('WEBSITE_SITE_NAME') is not None or 
         os.environ.get('AZURE_CLIENT_ID') is not None or
         os.environ.get('WEBSITE_RESOURCE_GROUP') is not None
     )
 
+@lru_cache(maxsize=1)
 def get_db_config():
-    """Get database configuration based on environment"""
+    """Get database configuration based on environment (read-only, computed once)"""
     if is_azure_deployment():
-        # Azure production database
-        return {
-            'user': os.environ.get('DB_USER', 'hpkrhbkroa'),
-            'password': os.environ.get('DB_PASSWORD', 'Resident20!)'),
+        # Azure production database; credentials must come from app settings.
+        # psycopg2 drops None values, so libpq's PGUSER/PGPASSWORD also work.
+        return MappingProxyType({
+            'user': os.environ.get('DB_USER'),
+            'password': os.environ.get('DB_PASSWORD'),
             'host': os.environ.get('DB_HOST', 'planreview-server.postgres.database.azure.com'),
             'port': int(os.environ.get('DB_PORT', '5432')),
             'database': os.environ.get('DB_NAME', 'postgres')
-        }
+        })
     else:
         # Local development database
-        return {
+        return MappingProxyType({
             'user': os.environ.get('DB_USER', 'admin'),
             'password': os.environ.get('DB_PASSWORD', 'admin'),
             'host': os.environ.get('DB_HOST', '127.0.0.1'),
             'port': int(os.environ.get('DB_PORT', '54547')),
             'database': os.environ.get('DB_NAME', 'postgres')
-        }
+        })
+
+IS_AZURE = is_azure_deployment()
+DB_CONFIG = get_db_config()
+
+# libpq options applied to every pooled connection. TCP keepalives stop Azure's
+# idle-connection reaper from silently dropping connections parked in the pool.
+DB_CONNECT_OPTIONS = {
+    'application_name': 'planreview',
+    'connect_timeout': 10,
+    'keepalives': 1,
+    'keepalives_idle': 30,
+    'keepalives_interval': 10,
+    'keepalives_count': 3
+}
 
 def create_db_pool():
-    """Create database connection pool"""
-    config = get_db_config()
-    if is_azure_deployment():
+    """Create database connection pool (bounds overridable with DB_POOL_MIN / DB_POOL_MAX)"""
+    if IS_AZURE:
         # Larger pool for Azure
-        return psycopg2.pool.ThreadedConnectionPool(
-            minconn=2,
-            maxconn=20,
-            **config
-        )
+        minconn, maxconn = 2, 20
     else:
         # Smaller pool for local dev
-        return psycopg2.pool.ThreadedConnectionPool(
-            minconn=1,
-            maxconn=5,
-            **config
-        )
+        minconn, maxconn = 1, 5
+    # Behind PgBouncer (transaction pooling) each worker only needs a few connections
+    return psycopg2.pool.ThreadedConnectionPool(
+        minconn=int(os.environ.get('DB_POOL_MIN', minconn)),
+        maxconn=int(os.environ.get('DB_POOL_MAX', maxconn)),
+        **DB_CONFIG,
+        **DB_CONNECT_OPTIONS
+    )
+
+def configure_logging():
+    """Send log records through a queue so request threads never block on log I/O"""
+    root = logging.getLogger()
+    if any(isinstance(h, logging.handlers.QueueHandler) for h in root.handlers):
+        return  # Already configured (e.g. module re-imported by the reloader)
+    
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    
+    root.setLevel(logging.INFO)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener.start()
+    atexit.register(listener.stop)
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that encodes responses and decodes request bodies with orjson"""
+    # Datetimes fall through to Flask's default so they keep the HTTP date format;
+    # numpy arrays and scalars (e.g. from OpenCV/Tesseract) are encoded natively
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.options).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        # Used by request.get_json()
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Used by jsonify(); hand orjson's bytes straight to the response
+        # instead of decoding to str and re-encoding
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.options)
+        return self._app.response_class(body, mimetype=self.mimetype)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
+app.config['MAX_CONTENT_LENGTH'] = MAX_JSON_REQUEST_SIZE
 
 # Create connection pool instead of single connection
 db_pool = create_db_pool()
 
+# OCR for freshly uploaded PDFs runs here so the upload response doesn't wait on it
+ocr_executor = ThreadPoolExecutor(max_workers=OCR_BACKGROUND_WORKERS, thread_name_prefix='upload-ocr')
+
 def get_db_connection():
     """Get a connection from the pool"""
     return db_pool.getconn()
 
-def return_db_connection(conn):
-    """Return a connection to the pool"""
-    db_pool.putconn(conn)
+def return_db_connection(conn, close=False):
+    """Return a connection to the pool (close=True discards it instead)"""
+    db_pool.putconn(conn, close=close)
 
 from contextlib import contextmanager
 
 @contextmanager
-def db_connection():
-    """Context manager for database connections"""
+def db_connection(autocommit=False):
+    """Context manager for database connections
+
+    Read-only handlers pass autocommit=True so their SELECTs run without the
+    implicit BEGIN, and without the ROLLBACK the pool issues for a connection
+    returned mid-transaction.
+    """
     conn = get_db_connection()
+    discard = False
+    if autocommit:
+        conn.autocommit = True
     try:
         yield conn
+    except Exception:
+        # Never hand a connection with a failed transaction back to the pool
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            discard = True
+        raise
     finally:
-        return_db_connection(conn)
+        if autocommit and not discard:
+            conn.autocommit = False
+        return_db_connection(conn, close=discard)
+
+# Verified against on unknown usernames so login timing matches a real account
+DUMMY_PASSWORD_HASH = generate_password_hash(os.urandom(16).hex(), method=PASSWORD_HASH_METHOD)
+# Werkzeug stores the method with its defaults filled in (e.g. "scrypt" -> "scrypt:32768:8:1"),
+# so compare stored hashes against that normalized form rather than the configured string
+PASSWORD_HASH_PREFIX = DUMMY_PASSWORD_HASH.split('$', 1)[0]
+
+def password_needs_rehash(password_hash):
+    """Check whether a stored hash was created with a different method than PASSWORD_HASH_METHOD"""
+    return password_hash.split('$', 1)[0] != PASSWORD_HASH_PREFIX
+
+def make_reviewroom_etag(review_room_id, updated_at):
+    """Build an ETag from a review room's id and last update time (microseconds, hex)"""
+    stamp = int(updated_at.timestamp() * 1_000_000) if updated_at else 0
+    return f"{review_room_id}-{stamp:x}"
+
+def is_not_modified(etag, updated_at):
+    """Check the request's If-None-Match / If-Modified-Since headers against the current version"""
+    if request.if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110); the
+        # client may hold either the identity or the gzip variant
+        return (request.if_none_match.contains_weak(etag)
+                or request.if_none_match.contains_weak(etag + GZIP_ETAG_SUFFIX))
+    if updated_at and request.if_modified_since:
+        # Last-Modified is emitted from the naive DB timestamp, so compare naively at second precision
+        return updated_at.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+def not_modified_response(etag, cache_control):
+    """Build an empty 304 response that refreshes the client's cached copy"""
+    # Echo the validator of the representation the client actually has
+    if request.if_none_match.contains_weak(etag + GZIP_ETAG_SUFFIX):
+        etag += GZIP_ETAG_SUFFIX
+    return Response(status=304, headers={'ETag': f'"{etag}"', 'Cache-Control': cache_control})
+
+def get_paging_args():
+    """Read the optional limit/offset query args; returns (limit, offset, error message or None)"""
+    try:
+        limit = request.args.get('limit')
+        limit = int(limit) if limit is not None else None
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return None, None, "limit and offset must be integers"
+    if limit is not None and not 0 <= limit <= MAX_PAGE_SIZE:
+        return None, None, f"limit must be between 0 and {MAX_PAGE_SIZE}"
+    if offset < 0:
+        return None, None, "offset must not be negative"
+    return limit, offset, None
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"ok": False, "error": "Request body too large"}), 413
+
+@app.after_request
+def compress_json_response(response):
+    """Gzip JSON responses larger than COMPRESS_MIN_SIZE when the client accepts it"""
+    # PDFs are already compressed and streamed/passthrough bodies must not be buffered
+    if (response.mimetype != 'application/json'
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or not request.accept_encodings['gzip']):
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    # The gzip body is a different representation, so it needs its own validator
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(etag + GZIP_ETAG_SUFFIX, weak=weak)
+    response.vary.add('Accept-Encoding')
+    return response
 
 def login_required(f):
     @wraps(f)
@@ -99,34 +278,54 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+@lru_cache(maxsize=None)
+def render_static_template(template_name):
+    """Render a template that takes no context once and reuse the HTML"""
+    return render_template(template_name)
+
+def static_page(template_name, cache_control=None):
+    """Serve a context-free template, re-rendering every time in debug so edits show up"""
+    html = render_template(template_name) if app.debug else render_static_template(template_name)
+    response = Response(html, mimetype='text/html')
+    if cache_control:
+        response.headers['Cache-Control'] = cache_control
+    return response
+
 @app.route('/')
 def index():
-    return render_template('login.html')
+    return static_page('login.html', 'public, max-age=300')
 
 @app.route('/sign-up')
 def signup_page():
-    return render_template('signup.html')
+    return static_page('signup.html', 'public, max-age=300')
 
+# Pages behind login are not marked cacheable so a browser never shows them
+# after logout without going through login_required again
 @app.route('/c')
 @login_required
 def chat_interface():
-    return render_template('chat.html')
+    return static_page('chat.html')
 
 @app.route('/review-room')
 @login_required
 def review_room():
-    return render_template('reviewroom.html')
+    return static_page('reviewroom.html')
 
 @app.post("/api/signup")
 def signup():
     data = request.get_json(silent=True) or {}
     username = (data.get("username") or "").strip()
     password = data.get("password") or ""
-    pwd_hash = generate_password_hash(password)
 
     if not username or not password:
         return jsonify({"ok": False, "error": "username and password required for signup"}), 400
 
+    if len(password) < MIN_PASSWORD_LENGTH:
+        return jsonify({"ok": False, "error": f"password must be at least {MIN_PASSWORD_LENGTH} characters"}), 400
+
+    # Hash only after validation so rejected requests don't pay the KDF cost
+    pwd_hash = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
     with db_connection() as cnx:
         with cnx.cursor() as cur:
             login_time = datetime.datetime.now()
@@ -159,28 +358,28 @@ def login():
     username = (data.get("username") or "").strip()
     password = data.get("password") or ""
 
-    pwd_hash = generate_password_hash(password)
-
     if not username or not password:
         return jsonify({"ok": False, "error": "username and password required for signin"}), 400
 
     with db_connection() as cnx:
         try:
             with cnx.cursor() as cur:
-                # 1) Lock the row to prevent race conditions on attempts
+                # 1) Fetch credentials without a row lock; the KDF below is slow and
+                #    must not run while holding one
                 cur.execute(
-                    f"""
+                    """
                     SELECT user_id, password_hash, login_attempts
                     FROM userdata
                     WHERE username = %s
-                    FOR UPDATE
                     """,
                     (username,)
                 )
                 row = cur.fetchone()
 
                 if row is None:
-                    # Unknown user: don't reveal that; same message as bad password
+                    # Unknown user: don't reveal that; same message as bad password, and
+                    # run one verification anyway so response time doesn't leak it either
+                    check_password_hash(DUMMY_PASSWORD_HASH, password)
                     return jsonify({"ok": False, "error": "Invalid credentials"}), 401
 
                 user_id, password_hash, attempts = row
@@ -190,44 +389,44 @@ def login():
                     return jsonify({"ok": False, "error": "Account locked due to too many attempts"}), 423
 
                 # 3) Verify password
-                if check_password_hash(password_hash, password):
-                    # Success: reset attempts and update last_login atomically
-                    cur.execute(
-                        f"""
-                        UPDATE userdata
-                        SET login_attempts = 0,
-                            last_login = NOW()
-                        WHERE user_id = %s
-                        """,
-                        (user_id,)
-                    )
-                    cnx.commit()
-                    session['user_id'] = user_id
-                    session['username'] = username
-                    return jsonify({"ok": True, "message": "Login successful"}), 200
-                else:
-                    # Failure: increment attempts and return status
-                    cur.execute(
-                        """
-                        UPDATE userdata
-                        SET login_attempts = COALESCE(login_attempts, 0) + 1
-                        WHERE user_id = %s
-                        RETURNING login_attempts
-                        """,
-                        (user_id,)
-                    )
-                    new_attempts = cur.fetchone()[0]
-                    cnx.commit()
+                verified = check_password_hash(password_hash, password)
+                if verified and password_needs_rehash(password_hash):
+                    # Lazily migrate hashes created with a different method/cost
+                    password_hash = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
 
-                    if new_attempts >= MAX_LOGIN_ATTEMPTS:
-                        return jsonify({"ok": False, "error": "Account locked due to too many attempts"}), 423
+                # 4) Record the attempt in one statement: success resets attempts and
+                #    updates last_login, failure increments attempts. The lockout guard
+                #    is re-checked for successes in case concurrent failures locked
+                #    the account while we were verifying.
+                cur.execute(
+                    """
+                    UPDATE userdata
+                    SET login_attempts = CASE WHEN %s THEN 0 ELSE COALESCE(login_attempts, 0) + 1 END,
+                        last_login = CASE WHEN %s THEN NOW() ELSE last_login END,
+                        password_hash = CASE WHEN %s THEN %s ELSE password_hash END
+                    WHERE user_id = %s AND (NOT %s OR COALESCE(login_attempts, 0) < %s)
+                    RETURNING login_attempts
+                    """,
+                    (verified, verified, verified, password_hash, user_id, verified, MAX_LOGIN_ATTEMPTS)
+                )
+                row = cur.fetchone()
+                cnx.commit()
+
+                new_attempts = row[0] if row else MAX_LOGIN_ATTEMPTS
+                if new_attempts >= MAX_LOGIN_ATTEMPTS:
+                    return jsonify({"ok": False, "error": "Account locked due to too many attempts"}), 423
+                if not verified:
                     return jsonify({"ok": False, "error": "Invalid credentials"}), 401
 
-        except Exception as e:
+                session['user_id'] = user_id
+                session['username'] = username
+                return jsonify({"ok": True, "message": "Login successful"}), 200
+
+        except Exception:
             # Roll back on any error
             cnx.rollback()
-            print(e)
-            # Avoid leaking internals in prod; log e server-side instead
+            logger.exception("Error during login")
+            # Avoid leaking internals in prod; details are logged server-side
             return jsonify({"ok": False, "error": "Server error"}), 500
 
 @app.route('/api/logout', methods=['POST'])
@@ -238,44 +437,43 @@ def logout():
 @app.route('/api/conversations', methods=['GET'])
 @login_required
 def get_conversations():
+    # Optional paging; LIMIT NULL returns all rows
+    limit, offset, error = get_paging_args()
+    if error:
+        return jsonify({"ok": False, "error": error}), 400
     try:
-        with db_connection() as cnx:
-            with cnx.cursor() as cur:
+        with db_connection(autocommit=True) as cnx:
+            # Rows come back as dicts built by psycopg2, keyed by column name
+            with cnx.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
                 cur.execute(
                     """
-                    SELECT conversation_id, title, last_message_at, conversation_type, is_favorite
+                    SELECT conversation_id, title,
+                           to_char(last_message_at, %s) AS last_message_at,
+                           conversation_type, is_favorite
                     FROM conversations 
                     WHERE user_id = %s AND is_active = TRUE
-                    ORDER BY last_message_at DESC
+                    ORDER BY conversations.last_message_at DESC
+                    LIMIT %s OFFSET %s
                     """,
-                    (session['user_id'],)
+                    (ISO_TIMESTAMP_FORMAT, session['user_id'], limit, offset)
                 )
                 
-                conversations = []
-                for row in cur.fetchall():
-                    conversations.append({
-                        'conversation_id': row[0],
-                        'title': row[1],
-                        'last_message_at': row[2].isoformat() if row[2] else None,
-                        'conversation_type': row[3],
-                        'is_favorite': row[4]
-                    })
-                
+                conversations = cur.fetchall()
                 return jsonify({"ok": True, "conversations": conversations}), 200
                 
-    except Exception as e:
-        print(f"Error fetching conversations: {e}")
+    except Exception:
+        logger.exception("Error fetching conversations")
         return jsonify({"ok": False, "error": "Failed to fetch conversations"}), 500
 
 @app.route('/api/conversations/<int:conversation_id>', methods=['GET'])
 @login_required
 def get_conversation_messages(conversation_id):
     try:
-        with db_connection() as cnx:
+        with db_connection(autocommit=True) as cnx:
             with cnx.cursor() as cur:
                 cur.execute(
                     """
-                    SELECT conversation_history, title 
+                    SELECT conversation_history::text, title 
                     FROM conversations 
                     WHERE conversation_id = %s AND user_id = %s AND is_active = TRUE
                     """,
@@ -288,21 +486,27 @@ def get_conversation_messages(conversation_id):
                 
                 conversation_history, title = row
                 
-                return jsonify({
-                    "ok": True, 
-                    "conversation_id": conversation_id,
-                    "title": title,
-                    "messages": conversation_history or []
-                }), 200
+                # The history is already serialized JSON in the database; splice
+                # the text into the envelope instead of parsing and re-encoding it.
+                body = b''.join([
+                    b'{"ok":true,"conversation_id":',
+                    orjson.dumps(conversation_id),
+                    b',"title":',
+                    orjson.dumps(title),
+                    b',"messages":',
+                    (conversation_history or '[]').encode('utf-8'),
+                    b'}'
+                ])
+                return Response(body, mimetype='application/json'), 200
                 
-    except Exception as e:
-        print(f"Error fetching conversation messages: {e}")
+    except Exception:
+        logger.exception("Error fetching conversation messages")
         return jsonify({"ok": False, "error": "Failed to fetch conversation messages"}), 500
 
 @app.route('/api/chat', methods=['POST'])
 @login_required
 def chat():
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     message = data.get('message', '')
     assistant_id = data.get('assistant_id')
     thread_id = data.get('thread_id')
@@ -334,72 +538,63 @@ def chat():
 
 def save_conversation_to_db(conversation_id, user_message, ai_response, user_id, prompt_id, conversation_api_id):
     """Save or update conversation in the database"""
-    try:
-        with db_connection as cnx:
+    timestamp = datetime.datetime.now().isoformat()
+    new_messages = [
+        {"role": "user", "content": user_message, "timestamp": timestamp},
+        {"role": "assistant", "content": ai_response, "timestamp": timestamp}
+    ]
+    
+    # Generate title from first user message (truncate if too long); only used
+    # when a new conversation has to be created
+    title = user_message[:50] + "..." if len(user_message) > 50 else user_message
+    history = psycopg2.extras.Json(new_messages)
+    
+    with db_connection() as cnx:
+        try:
             with cnx.cursor() as cur:
-                if conversation_id:
-                    # Update existing conversation
-                    cur.execute(
-                        """
-                        SELECT conversation_history FROM conversations 
-                        WHERE conversation_id = %s AND user_id = %s
-                        """,
-                        (conversation_id, user_id)
-                    )
-                    
-                    row = cur.fetchone()
-                    if row:
-                        # Append new messages to existing history
-                        current_history = row[0] if row[0] else []
-                        current_history.extend([
-                            {"role": "user", "content": user_message, "timestamp": datetime.datetime.now().isoformat()},
-                            {"role": "assistant", "content": ai_response, "timestamp": datetime.datetime.now().isoformat()}
-                        ])
-                        
-                        cur.execute(
-                            """
-                            UPDATE conversations 
-                            SET conversation_history = %s, 
-                                last_message_at = CURRENT_TIMESTAMP,
-                                updated_at = CURRENT_TIMESTAMP
-                            WHERE conversation_id = %s AND user_id = %s
-                            """,
-                            (psycopg2.extras.Json(current_history), conversation_id, user_id)
-                        )
-                        cnx.commit()
-                        return conversation_id
-                
-                # Create new conversation
-                # Generate title from first user message (truncate if too long)
-                title = user_message[:50] + "..." if len(user_message) > 50 else user_message
-                
-                conversation_history = [
-                    {"role": "user", "content": user_message, "timestamp": datetime.datetime.now().isoformat()},
-                    {"role": "assistant", "content": ai_response, "timestamp": datetime.datetime.now().isoformat()}
-                ]
-                
+                # Append the new messages server-side so the existing history is
+                # never read into Python, and create the conversation in the same
+                # round trip if there is nothing to append to
                 cur.execute(
                     """
-                    INSERT INTO conversations (title, conversation_history, user_id, last_message_at)
-                    VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
-                    RETURNING conversation_id
+                    WITH upd AS (
+                        UPDATE conversations 
+                        SET conversation_history = COALESCE(conversation_history, '[]'::jsonb) || %s::jsonb, 
+                            last_message_at = CURRENT_TIMESTAMP,
+                            updated_at = CURRENT_TIMESTAMP
+                        WHERE conversation_id = %s AND user_id = %s
+                        RETURNING conversation_id
+                    ), ins AS (
+                        INSERT INTO conversations (title, conversation_history, user_id, last_message_at)
+                        SELECT %s, %s::jsonb, %s, CURRENT_TIMESTAMP
+                        WHERE NOT EXISTS (SELECT 1 FROM upd)
+                        RETURNING conversation_id
+                    )
+                    SELECT conversation_id FROM upd
+                    UNION ALL
+                    SELECT conversation_id FROM ins
                     """,
-                    (title, psycopg2.extras.Json(conversation_history), user_id)
+                    (history, conversation_id, user_id, title, history, user_id)
                 )
                 
-                new_conversation_id = cur.fetchone()[0]
+                saved_conversation_id = cur.fetchone()[0]
                 cnx.commit()
-                return new_conversation_id
+                return saved_conversation_id
                 
-    except Exception as e:
-        print(f"Error saving conversation: {e}")
-        cnx.rollback()
-        return conversation_id  # Return original ID if update fails
+        except Exception:
+            logger.exception("Error saving conversation")
+            cnx.rollback()
+            return conversation_id  # Return original ID if update fails
 
 @app.route('/api/upload-pdf', methods=['POST'])
 @login_required
 def upload_pdf():
+    request.max_content_length = MAX_UPLOAD_REQUEST_SIZE
     try:
+        # Reject clearly oversized requests before the multipart body is parsed
+        if request.content_length and request.content_length > MAX_UPLOAD_REQUEST_SIZE:
+            return jsonify({"ok": False, "error": "File size must be less than 10MB"}), 413
+        
         # Check if file is present in request
         if 'file' not in request.files:
             return jsonify({"ok": False, "error": "No file provided"}), 400
@@ -413,12 +608,18 @@ def upload_pdf():
         if not file.filename.lower().endswith('.pdf'):
             return jsonify({"ok": False, "error": "Only PDF files are allowed"}), 400
             
-        # Read file content
-        file_content = file.read()
+        # Read at most one byte past the limit so oversized uploads are rejected
+        # without buffering the whole file
+        file_content = file.read(MAX_PDF_SIZE + 1)
         
         # Validate file size (10MB limit)
-        if len(file_content) > 10 * 1024 * 1024:
+        if len(file_content) > MAX_PDF_SIZE:
             return jsonify({"ok": False, "error": "File size must be less than 10MB"}), 413
+        
+        # Check the PDF header rather than trusting the extension
+        # (the spec allows it anywhere in the first 1024 bytes)
+        if b'%PDF-' not in file_content[:1024]:
+            return jsonify({"ok": False, "error": "Only PDF files are allowed"}), 400
             
         # Get additional data from request
         title = request.form.get('title', secure_filename(file.filename))
@@ -433,6 +634,8 @@ def upload_pdf():
         )
         
         if review_room_id:
+            # Have OCR ready (and persisted) by the time the room is opened
+            ocr_executor.submit(prefetch_reviewroom_ocr, review_room_id, session['user_id'])
             return jsonify({
                 "ok": True, 
                 "review_room_id": review_room_id,
@@ -441,8 +644,11 @@ def upload_pdf():
         else:
             return jsonify({"ok": False, "error": "Failed to save PDF"}), 500
             
-    except Exception as e:
-        print(f"Error uploading PDF: {e}")
+    except HTTPException:
+        # e.g. 413 when the body exceeds the request's max_content_length
+        raise
+    except Exception:
+        logger.exception("Error uploading PDF")
         return jsonify({"ok": False, "error": "Upload failed"}), 500
 
 def save_pdf_to_reviewroom(title, pdf_content, user_id, filename=""):
@@ -468,81 +674,94 @@ def save_pdf_to_reviewroom(title, pdf_content, user_id, filename=""):
                 cnx.commit()
                 return review_room_id
                 
-    except Exception as e:
-        print(f"Error saving PDF to database: {e}")
-        cnx.rollback()
+    except Exception:
+        logger.exception("Error saving PDF to database")
         return None
 
 @app.route('/api/reviewrooms/<int:review_room_id>/pdf', methods=['GET'])
 @login_required
 def get_reviewroom_pdf(review_room_id):
     try:
-        with db_connection() as cnx:
+        with db_connection(autocommit=True) as cnx:
             with cnx.cursor() as cur:
-                # First, check if PDF exists and get metadata for caching
-                cur.execute(
-                    """
-                    SELECT title, updated_at
-                    FROM reviewrooms 
-                    WHERE review_room_id = %s AND user_id = %s AND is_active = TRUE
-                    """,
-                    (review_room_id, session['user_id'])
-                )
+                user_id = session['user_id']
+                conditional = bool(request.if_none_match or request.if_modified_since)
                 
-                metadata_row = cur.fetchone()
-                if not metadata_row:
+                if conditional:
+                    # Client may have it cached: check the version first so a 304 never reads the BYTEA
+                    cur.execute(
+                        """
+                        SELECT title, updated_at, NULL
+                        FROM reviewrooms 
+                        WHERE review_room_id = %s AND user_id = %s AND is_active = TRUE
+                        """,
+                        (review_room_id, user_id)
+                    )
+                else:
+                    # The PDF is needed anyway, so fetch it with the metadata in one round trip
+                    # (only the first file, not the whole array)
+                    cur.execute(
+                        """
+                        SELECT title, updated_at, pdf_files[1]
+                        FROM reviewrooms 
+                        WHERE review_room_id = %s AND user_id = %s AND is_active = TRUE
+                        """,
+                        (review_room_id, user_id)
+                    )
+                
+                row = cur.fetchone()
+                if not row:
                     return jsonify({"ok": False, "error": "Review room not found"}), 404
                 
-                title, updated_at = metadata_row
+                title, updated_at, pdf_data = row
                 
                 # Create ETag based on review_room_id and updated_at for caching
-                import hashlib
-                etag = hashlib.md5(f"{review_room_id}-{updated_at}".encode()).hexdigest()
+                etag = make_reviewroom_etag(review_room_id, updated_at)
                 
                 # Check if client has cached version
-                if request.headers.get('If-None-Match') == f'"{etag}"':
-                    from flask import Response
-                    return Response(status=304)  # Not Modified
+                if is_not_modified(etag, updated_at):
+                    return not_modified_response(etag, 'private, max-age=3600')
                 
-                # Now get the actual PDF data
-                cur.execute(
-                    """
-                    SELECT pdf_files
-                    FROM reviewrooms 
-                    WHERE review_room_id = %s AND user_id = %s AND is_active = TRUE
-                    """,
-                    (review_room_id, session['user_id'])
-                )
-                
-                row = cur.fetchone()
-                if not row:
-                    return jsonify({"ok": False, "error": "Review room not found"}), 404
+                if conditional:
+                    # Stale cache: now get the actual PDF data
+                    cur.execute(
+                        """
+                        SELECT pdf_files[1]
+                        FROM reviewrooms 
+                        WHERE review_room_id = %s AND user_id = %s AND is_active = TRUE
+                        """,
+                        (review_room_id, user_id)
+                    )
+                    row = cur.fetchone()
+                    pdf_data = row[0] if row else None
                 
-                pdf_files = row[0]
-                if not pdf_files or len(pdf_files) == 0:
+                if pdf_data is None:
                     return jsonify({"ok": False, "error": "No PDF found in this review room"}), 404
                 
-                # Get the first PDF file
-                pdf_data = pdf_files[0]
+                # psycopg2 returns BYTEA as a memoryview
+                pdf_bytes = bytes(pdf_data)
                 
                 # Create response with PDF data and caching headers
-                from flask import Response
                 response = Response(
-                    pdf_data,
+                    pdf_bytes,
                     mimetype='application/pdf',
                     headers={
                         'Content-Disposition': f'inline; filename="{title}.pdf"',
                         'Content-Type': 'application/pdf',
-                        'Content-Length': str(len(pdf_data)),
                         'ETag': f'"{etag}"',
                         'Cache-Control': 'private, max-age=3600',  # Cache for 1 hour
                         'Last-Modified': updated_at.strftime('%a, %d %b %Y %H:%M:%S GMT') if updated_at else ''
                     }
                 )
-                return response
+                # Honor Range requests (206 Partial Content) so PDF viewers can fetch
+                # byte ranges; Content-Length is set by werkzeug for the served range
+                return response.make_conditional(request, accept_ranges=True, complete_length=len(pdf_bytes))
                 
-    except Exception as e:
-        print(f"Error fetching review room PDF: {e}")
+    except HTTPException:
+        # e.g. 416 from make_conditional for an unsatisfiable Range
+        raise
+    except Exception:
+        logger.exception("Error fetching review room PDF")
         return jsonify({"ok": False, "error": "Failed to fetch PDF"}), 500
 
 @app.route('/api/reviewrooms/<int:review_room_id>/pdf/info', methods=['GET'])
@@ -550,7 +769,7 @@ def get_reviewroom_pdf(review_room_id):
 def get_reviewroom_pdf_info(review_room_id):
     """Get PDF metadata without loading the actual PDF data"""
     try:
-        with db_connection() as cnx:
+        with db_connection(autocommit=True) as cnx:
             with cnx.cursor() as cur:
                 cur.execute(
                     """
@@ -573,10 +792,11 @@ def get_reviewroom_pdf_info(review_room_id):
                     return jsonify({"ok": False, "error": "No PDF found in this review room"}), 404
                 
                 # Create ETag for caching consistency
-                import hashlib
-                etag = hashlib.md5(f"{review_room_id}-{updated_at}".encode()).hexdigest()
+                etag = make_reviewroom_etag(review_room_id, updated_at)
+                if is_not_modified(etag, updated_at):
+                    return not_modified_response(etag, 'private, no-cache')
                 
-                return jsonify({
+                response = jsonify({
                     "ok": True,
                     "review_room_id": review_room_id,
                     "title": title,
@@ -584,41 +804,44 @@ def get_reviewroom_pdf_info(review_room_id):
                     "etag": etag,
                     "last_modified": updated_at.isoformat() if updated_at else None,
                     "pdf_url": f"/api/reviewrooms/{review_room_id}/pdf"
-                }), 200
+                })
+                response.headers['ETag'] = f'"{etag}"'
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response, 200
                 
-    except Exception as e:
-        print(f"Error fetching PDF info: {e}")
+    except Exception:
+        logger.exception("Error fetching PDF info")
         return jsonify({"ok": False, "error": "Failed to fetch PDF info"}), 500
 
 @app.route('/api/reviewrooms', methods=['GET'])
 @login_required
 def get_reviewrooms():
+    # Optional paging; LIMIT NULL returns all rows
+    limit, offset, error = get_paging_args()
+    if error:
+        return jsonify({"ok": False, "error": error}), 400
     try:
-        with db_connection() as cnx:
-            with cnx.cursor() as cur:
+        with db_connection(autocommit=True) as cnx:
+            # Rows come back as dicts built by psycopg2, keyed by column name
+            with cnx.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
                 cur.execute(
                     """
-                    SELECT review_room_id, title, last_message_at, is_favorite
+                    SELECT review_room_id, title,
+                           to_char(last_message_at, %s) AS last_message_at,
+                           is_favorite
                     FROM reviewrooms 
                     WHERE user_id = %s AND is_active = TRUE
-                    ORDER BY last_message_at DESC
+                    ORDER BY reviewrooms.last_message_at DESC
+                    LIMIT %s OFFSET %s
                     """,
-                    (session['user_id'],)
+                    (ISO_TIMESTAMP_FORMAT, session['user_id'], limit, offset)
                 )
                 
-                reviewrooms = []
-                for row in cur.fetchall():
-                    reviewrooms.append({
-                        'review_room_id': row[0],
-                        'title': row[1],
-                        'last_message_at': row[2].isoformat() if row[2] else None,
-                        'is_favorite': row[3]
-                    })
-                
+                reviewrooms = cur.fetchall()
                 return jsonify({"ok": True, "reviewrooms": reviewrooms}), 200
                 
-    except Exception as e:
-        print(f"Error fetching review rooms: {e}")
+    except Exception:
+        logger.exception("Error fetching review rooms")
         return jsonify({"ok": False, "error": "Failed to fetch review rooms"}), 500
 
 @app.route('/api/reviewers', methods=['GET'])
@@ -627,12 +850,15 @@ def get_available_reviewers():
     """Get list of available reviewers"""
     try:
         reviewers = planreview.load_reviewers()
-        return jsonify({
+        response = jsonify({
             "ok": True,
             "reviewers": reviewers['reviewers']
-        }), 200
-    except Exception as e:
-        print(f"Error loading reviewers: {e}")
+        })
+        # The reviewer list only changes on redeploy
+        response.headers['Cache-Control'] = 'private, max-age=300'
+        return response, 200
+    except Exception:
+        logger.exception("Error loading reviewers")
         return jsonify({"ok": False, "error": "Failed to load reviewers"}), 500
 
 @app.route('/api/reviewrooms/<int:review_room_id>/submit-plan', methods=['POST'])
@@ -641,71 +867,89 @@ def submit_plan_for_review(review_room_id):
     """Submit the first sheet of a plan set to OpenAI Assistants API for review"""
     try:
         # Get reviewer from request body
-        data = request.get_json() or {}
+        data = request.get_json(silent=True) or {}
         reviewer_name = data.get('reviewer_name', 'Stormwater Reviewer')  # Default to Stormwater
+        user_id = session['user_id']
         
-        # Get the review room and PDF
-        with db_connection() as cnx:
+        is_stormwater = reviewer_name == 'Stormwater Reviewer'
+        
+        # Get the review room and PDF; the connection goes back to the pool
+        # before the slow OCR and reviewer calls below
+        with db_connection(autocommit=True) as cnx:
             with cnx.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT pdf_files, title
-                    FROM reviewrooms 
-                    WHERE review_room_id = %s AND user_id = %s AND is_active = TRUE
-                    """,
-                    (review_room_id, session['user_id'])
-                )
-                
-                row = cur.fetchone()
-                if not row:
-                    return jsonify({"ok": False, "error": "Review room not found"}), 404
-                
-                pdf_files, title = row
-                if not pdf_files or len(pdf_files) == 0:
-                    return jsonify({"ok": False, "error": "No PDF found in this review room"}), 404
-                
-                # Get the first PDF (first sheet)
-                first_pdf = pdf_files[0]
-                
-                # Submit to selected reviewer
-                if reviewer_name == 'Stormwater Reviewer':
-                    result = planreview.submit_plan_to_stormwater_reviewer(first_pdf, title)
+                if is_stormwater:
+                    # The stormwater prompt includes the OCR text; reuse what the OCR endpoints stored
+                    cur.execute(
+                        """
+                        SELECT pdf_files[1], title, ocr_blocks, ocr_cache_key
+                        FROM reviewrooms 
+                        WHERE review_room_id = %s AND user_id = %s AND is_active = TRUE
+                        """,
+                        (review_room_id, user_id)
+                    )
                 else:
-                    result = planreview.submit_plan_to_reviewer(first_pdf, title, reviewer_name)
-                
-                if result.get('status') == 'success':
-                    comments_data = result.get('comments_data')
-                    
-                    # Store the review comments in the database
                     cur.execute(
                         """
-                        UPDATE reviewrooms 
-                        SET review_comments = %s,
-                            last_message_at = CURRENT_TIMESTAMP,
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE review_room_id = %s AND user_id = %s
+                        SELECT pdf_files[1], title, NULL, NULL
+                        FROM reviewrooms 
+                        WHERE review_room_id = %s AND user_id = %s AND is_active = TRUE
                         """,
-                        (psycopg2.extras.Json(comments_data), review_room_id, session['user_id'])
+                        (review_room_id, user_id)
                     )
-                    cnx.commit()
-                    
-                    return jsonify({
-                        "ok": True,
-                        "message": "Plan submitted for review successfully",
-                        "review_comments": comments_data,
-                        "prompt_id": result.get('prompt_id'),
-                        "conversation_id": result.get('conversation_id')
-                    }), 200
                 
-                else:
-                    return jsonify({
-                        "ok": False, 
-                        "error": result.get('error', 'Unknown error'),
-                        "details": result.get('details', '')
-                    }), 500
-                    
-    except Exception as e:
-        print(f"Error submitting plan for review: {e}")
+                row = cur.fetchone()
+                if not row:
+                    return jsonify({"ok": False, "error": "Review room not found"}), 404
+                
+                # Only the first PDF (first sheet) is reviewed
+                first_pdf, title, stored_blocks, stored_key = row
+                if first_pdf is None:
+                    return jsonify({"ok": False, "error": "No PDF found in this review room"}), 404
+        
+        # Submit to selected reviewer
+        if is_stormwater:
+            ocr_data = get_reviewroom_ocr_blocks(review_room_id, user_id, first_pdf, stored_blocks, stored_key)
+            result = planreview.submit_plan_to_stormwater_reviewer(first_pdf, title, ocr_data)
+        else:
+            result = planreview.submit_plan_to_reviewer(first_pdf, title, reviewer_name)
+        
+        if result.get('status') != 'success':
+            return jsonify({
+                "ok": False, 
+                "error": result.get('error', 'Unknown error'),
+                "details": result.get('details', '')
+            }), 500
+        
+        comments_data = result.get('comments_data')
+        
+        # Store the review comments in the database
+        with db_connection() as cnx:
+            with cnx.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE reviewrooms 
+                    SET review_comments = %s,
+                        last_message_at = CURRENT_TIMESTAMP,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE review_room_id = %s AND user_id = %s
+                    """,
+                    (psycopg2.extras.Json(comments_data), review_room_id, user_id)
+                )
+                cnx.commit()
+        
+        return jsonify({
+            "ok": True,
+            "message": "Plan submitted for review successfully",
+            "review_comments": comments_data,
+            "prompt_id": result.get('prompt_id'),
+            "conversation_id": result.get('conversation_id')
+        }), 200
+        
+    except HTTPException:
+        # e.g. 413 from get_json when the body exceeds MAX_CONTENT_LENGTH
+        raise
+    except Exception:
+        logger.exception("Error submitting plan for review")
         return jsonify({"ok": False, "error": "Failed to submit plan for review"}), 500
 
 @app.route('/api/reviewrooms/<int:review_room_id>/comments', methods=['GET'])
@@ -713,11 +957,11 @@ def submit_plan_for_review(review_room_id):
 def get_review_comments(review_room_id):
     """Get review comments for a specific review room"""
     try:
-        with db_connection() as cnx:
+        with db_connection(autocommit=True) as cnx:
             with cnx.cursor() as cur:
                 cur.execute(
                     """
-                    SELECT review_comments, title
+                    SELECT review_comments, title, updated_at
                     FROM reviewrooms 
                     WHERE review_room_id = %s AND user_id = %s AND is_active = TRUE
                     """,
@@ -728,105 +972,133 @@ def get_review_comments(review_room_id):
                 if not row:
                     return jsonify({"ok": False, "error": "Review room not found"}), 404
                 
-                review_comments, title = row
+                review_comments, title, updated_at = row
                 
-                return jsonify({
+                # Comments only change when the room is updated, so let clients revalidate
+                etag = make_reviewroom_etag(review_room_id, updated_at)
+                if is_not_modified(etag, updated_at):
+                    return not_modified_response(etag, 'private, no-cache')
+                
+                response = jsonify({
                     "ok": True,
                     "review_room_id": review_room_id,
                     "title": title,
                     "review_comments": review_comments or {"comments": []}
-                }), 200
+                })
+                response.headers['ETag'] = f'"{etag}"'
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response, 200
                 
-    except Exception as e:
-        print(f"Error fetching review comments: {e}")
+    except Exception:
+        logger.exception("Error fetching review comments")
         return jsonify({"ok": False, "error": "Failed to fetch review comments"}), 500
 
 # OCR functions have been moved to planreview.py module
 
-@app.route('/api/reviewrooms/<int:review_room_id>/ocr', methods=['POST'])
-@login_required
-def extract_ocr_from_review_room(review_room_id):
-    """Extract OCR data from a review room's PDF"""
+def _extract_review_room_ocr(review_room_id, count_key):
+    """Run OCR over a review room's first PDF and report the block count under count_key"""
+    user_id = session['user_id']
+    with db_connection(autocommit=True) as cnx:
+        with cnx.cursor() as cur:
+            # Get the PDF from the review room, along with any OCR stored for it
+            cur.execute(
+                """
+                SELECT pdf_files[1], title, ocr_blocks, ocr_cache_key
+                FROM reviewrooms 
+                WHERE review_room_id = %s AND user_id = %s AND is_active = TRUE
+                """,
+                (review_room_id, user_id)
+            )
+            
+            row = cur.fetchone()
+            if not row:
+                return jsonify({"ok": False, "error": "Review room not found"}), 404
+            
+            first_pdf, title, stored_blocks, stored_key = row
+            if first_pdf is None:
+                return jsonify({"ok": False, "error": "No PDF found in this review room"}), 404
+    
+    # OCR runs after the connection is back in the pool
+    ocr_results = get_reviewroom_ocr_blocks(review_room_id, user_id, first_pdf, stored_blocks, stored_key)
+    
+    return jsonify({
+        "ok": True,
+        "review_room_id": review_room_id,
+        "title": title,
+        "ocr_data": ocr_results,
+        "source": ocr_results[0].get("source", "ocr") if ocr_results else "ocr",
+        count_key: len(ocr_results)
+    }), 200
+
+def get_reviewroom_ocr_blocks(review_room_id, user_id, pdf_data, stored_blocks, stored_key):
+    """Return the room's stored OCR blocks if they match pdf_data, otherwise extract and store them"""
+    cache_key = planreview.ocr_cache_key(pdf_data)
+    if stored_blocks is not None and stored_key == cache_key:
+        return stored_blocks
+    
+    ocr_results = planreview.get_ocr_blocks(pdf_data)
+    if ocr_results:
+        save_ocr_to_reviewroom(review_room_id, user_id, ocr_results, cache_key)
+    return ocr_results
+
+def prefetch_reviewroom_ocr(review_room_id, user_id):
+    """Extract and store OCR for a newly uploaded PDF (runs on ocr_executor)"""
     try:
-        with db_connection() as cnx:
+        # Re-read the PDF here rather than queueing the upload bytes, so a burst of
+        # uploads waiting on the executor holds only ids in memory
+        with db_connection(autocommit=True) as cnx:
             with cnx.cursor() as cur:
-                # Get the PDF from the review room
                 cur.execute(
                     """
-                    SELECT pdf_files, title
+                    SELECT pdf_files[1], ocr_blocks, ocr_cache_key
                     FROM reviewrooms 
                     WHERE review_room_id = %s AND user_id = %s AND is_active = TRUE
                     """,
-                    (review_room_id, session['user_id'])
+                    (review_room_id, user_id)
                 )
-                
                 row = cur.fetchone()
-                if not row:
-                    return jsonify({"ok": False, "error": "Review room not found"}), 404
-                
-                pdf_files, title = row
-                if not pdf_files or len(pdf_files) == 0:
-                    return jsonify({"ok": False, "error": "No PDF found in this review room"}), 404
-                
-                # Get the first PDF (you could modify this to process all PDFs)
-                pdf_data = pdf_files[0]
-                
-                # Extract OCR data (need to add word-level function to planreview module)
-                ocr_results = planreview.extract_text_with_ocr_blocks(pdf_data)
-                
-                return jsonify({
-                    "ok": True,
-                    "review_room_id": review_room_id,
-                    "title": title,
-                    "ocr_data": ocr_results,
-                    "total_elements": len(ocr_results)
-                }), 200
-                
-    except Exception as e:
-        print(f"Error extracting OCR from review room: {e}")
-        return jsonify({"ok": False, "error": "Failed to extract OCR data"}), 500
+        
+        if row and row[0] is not None:
+            get_reviewroom_ocr_blocks(review_room_id, user_id, *row)
+    except Exception:
+        logger.exception("Error extracting OCR for uploaded PDF")
 
-@app.route('/api/reviewrooms/<int:review_room_id>/ocr-blocks', methods=['POST'])
-@login_required
-def extract_ocr_blocks_from_review_room(review_room_id):
-    """Extract OCR data as text blocks from a review room's PDF"""
+def save_ocr_to_reviewroom(review_room_id, user_id, ocr_results, cache_key):
+    """Store OCR blocks on the review room so later requests (and other workers) skip OCR"""
     try:
         with db_connection() as cnx:
             with cnx.cursor() as cur:
-                # Get the PDF from the review room
                 cur.execute(
                     """
-                    SELECT pdf_files, title
-                    FROM reviewrooms 
-                    WHERE review_room_id = %s AND user_id = %s AND is_active = TRUE
+                    UPDATE reviewrooms
+                    SET ocr_blocks = %s, ocr_cache_key = %s
+                    WHERE review_room_id = %s AND user_id = %s
                     """,
-                    (review_room_id, session['user_id'])
+                    (psycopg2.extras.Json(ocr_results), cache_key, review_room_id, user_id)
                 )
-                
-                row = cur.fetchone()
-                if not row:
-                    return jsonify({"ok": False, "error": "Review room not found"}), 404
-                
-                pdf_files, title = row
-                if not pdf_files or len(pdf_files) == 0:
-                    return jsonify({"ok": False, "error": "No PDF found in this review room"}), 404
-                
-                # Get the first PDF
-                pdf_data = pdf_files[0]
-                
-                # Extract OCR data as blocks
-                ocr_results = planreview.extract_text_with_ocr_blocks(pdf_data)
-                
-                return jsonify({
-                    "ok": True,
-                    "review_room_id": review_room_id,
-                    "title": title,
-                    "ocr_data": ocr_results,
-                    "total_blocks": len(ocr_results)
-                }), 200
-                
-    except Exception as e:
-        print(f"Error extracting OCR blocks from review room: {e}")
+                cnx.commit()
+    except Exception:
+        # The result is still returned to the caller; it just isn't persisted
+        logger.exception("Error saving OCR results to review room")
+
+@app.route('/api/reviewrooms/<int:review_room_id>/ocr', methods=['POST'])
+@login_required
+def extract_ocr_from_review_room(review_room_id):
+    """Extract OCR data from a review room's PDF"""
+    try:
+        return _extract_review_room_ocr(review_room_id, "total_elements")
+    except Exception:
+        logger.exception("Error extracting OCR from review room")
+        return jsonify({"ok": False, "error": "Failed to extract OCR data"}), 500
+
+@app.route('/api/reviewrooms/<int:review_room_id>/ocr-blocks', methods=['POST'])
+@login_required
+def extract_ocr_blocks_from_review_room(review_room_id):
+    """Extract OCR data as text blocks from a review room's PDF"""
+    try:
+        return _extract_review_room_ocr(review_room_id, "total_blocks")
+    except Exception:
+        logger.exception("Error extracting OCR blocks from review room")
         return jsonify({"ok": False, "error": "Failed to extract OCR data"}), 500
 
 if __name__ == '__main__':
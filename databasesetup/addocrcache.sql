@@ -0,0 +1,4 @@
+-- Adds the persisted OCR columns to an existing reviewrooms table.
+-- ocr_cache_key is planreview.ocr_cache_key() of the PDF the blocks were computed from.
+ALTER TABLE reviewrooms ADD COLUMN IF NOT EXISTS ocr_blocks JSONB;
+ALTER TABLE reviewrooms ADD COLUMN IF NOT EXISTS ocr_cache_key TEXT;
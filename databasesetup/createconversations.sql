@@ -21,6 +21,8 @@ CREATE TABLE conversations (
 CREATE INDEX idx_conversations_user_id ON conversations(user_id);
 CREATE INDEX idx_conversations_active ON conversations(user_id, is_active);
 CREATE INDEX idx_conversations_recent ON conversations(user_id, last_message_at);
+-- Covers get_conversations: index-only scan, already sorted, inactive rows excluded
+CREATE INDEX idx_conversations_user_active_recent ON conversations(user_id, last_message_at DESC) INCLUDE (conversation_id, title, conversation_type, is_favorite) WHERE is_active = TRUE;
 CREATE INDEX idx_conversations_archived ON conversations(user_id, is_archived);
 CREATE INDEX idx_conversations_favorites ON conversations(user_id, is_favorite);
 CREATE INDEX idx_conversation_history ON conversations USING GIN(conversation_history);
\ No newline at end of file
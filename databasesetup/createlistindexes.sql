@@ -0,0 +1,7 @@
+-- Adds the list-endpoint indexes to an existing database without blocking writes.
+-- Run each statement outside a transaction (CONCURRENTLY is not allowed inside one).
+DROP INDEX CONCURRENTLY IF EXISTS idx_conversations_user_active_recent;
+CREATE INDEX CONCURRENTLY idx_conversations_user_active_recent ON conversations(user_id, last_message_at DESC) INCLUDE (conversation_id, title, conversation_type, is_favorite) WHERE is_active = TRUE;
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_reviewrooms_user_active_recent;
+CREATE INDEX CONCURRENTLY idx_reviewrooms_user_active_recent ON reviewrooms(user_id, last_message_at DESC) INCLUDE (review_room_id, title, is_favorite) WHERE is_active = TRUE;
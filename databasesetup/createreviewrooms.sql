@@ -13,6 +13,8 @@ CREATE TABLE reviewrooms (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     pdf_files BYTEA[],
+    ocr_blocks JSONB,
+    ocr_cache_key TEXT,
     FOREIGN KEY (user_id) REFERENCES userData(user_id) ON DELETE CASCADE
 );
 
@@ -20,5 +22,7 @@ CREATE TABLE reviewrooms (
 CREATE INDEX idx_reviewrooms_user_id ON reviewrooms(user_id);
 CREATE INDEX idx_reviewrooms_active ON reviewrooms(user_id, is_active);
 CREATE INDEX idx_reviewrooms_recent ON reviewrooms(user_id, last_message_at);
+-- Covers get_reviewrooms: index-only scan, already sorted, inactive rows excluded
+CREATE INDEX idx_reviewrooms_user_active_recent ON reviewrooms(user_id, last_message_at DESC) INCLUDE (review_room_id, title, is_favorite) WHERE is_active = TRUE;
 CREATE INDEX idx_reviewrooms_archived ON reviewrooms(user_id, is_archived);
 CREATE INDEX idx_reviewrooms_favorites ON reviewrooms(user_id, is_favorite);
\ No newline at end of file
@@ -7,6 +7,12 @@ Handles uploading plans to assistants and processing review responses
 import os
 import json
 import base64
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Optional, Dict, Any
 import udochat
 import pytesseract
@@ -14,9 +20,42 @@ import cv2
 import numpy as np
 from pdf2image import convert_from_bytes
 from PIL import Image
+import pymupdf as fitz  # PyMuPDF
 
+# Bump when the OCR settings or output format change so stale entries are ignored
+OCR_CACHE_VERSION = "blocks:v2"
+OCR_CACHE_SIZE = 64
+# Resolution pages are rendered at for OCR; block coordinates are in pixels at this DPI
+OCR_DPI = 150
+
+# A PDF whose first TEXT_LAYER_SAMPLE_PAGES pages each carry at least
+# TEXT_LAYER_MIN_CHARS characters of embedded text is read directly instead of OCR'd
+TEXT_LAYER_MIN_CHARS = 200
+TEXT_LAYER_SAMPLE_PAGES = 3
+
+logger = logging.getLogger(__name__)
+
+_ocr_cache = OrderedDict()
+_ocr_cache_lock = threading.Lock()
+# Cache key -> {"done": Event, "result": list} for OCR runs in progress, so
+# concurrent requests for the same PDF wait on one run instead of starting their own
+_ocr_inflight = {}
+
+# Maximum OCR passes running at once per process; further requests wait their turn.
+# Each pass already spreads its pages over every core, so more passes add no
+# throughput, only rasterized plan sets held in memory and on disk at once.
+OCR_CONCURRENCY = max(1, int(os.environ.get('OCR_CONCURRENCY', 2)))
+# pdftoppm threads per pass, so concurrent passes together use about one per core
+OCR_RASTER_THREADS = max(1, (os.cpu_count() or 1) // OCR_CONCURRENCY)
+_ocr_slots = threading.BoundedSemaphore(OCR_CONCURRENCY)
+
+# Pages OCR'd at once across all requests in this process
+OCR_PAGE_WORKERS = max(1, int(os.environ.get('OCR_PAGE_WORKERS', os.cpu_count() or 1)))
+_page_executor = ThreadPoolExecutor(max_workers=OCR_PAGE_WORKERS, thread_name_prefix='ocr-page')
+
+@lru_cache(maxsize=1)
 def load_reviewers() -> Dict[str, Any]:
-    """Load active reviewers configuration"""
+    """Load active reviewers configuration (read once; call load_reviewers.cache_clear() to reload)"""
     with open('activereviewers.json', 'r') as f:
         return json.load(f)
 
@@ -28,6 +67,72 @@ def get_stormwater_reviewer() -> Optional[Dict[str, str]]:
             return reviewer
     return None
 
+def _ocr_page_blocks(page_num, image):
+    """Run Tesseract over one rendered page and group its words into text blocks"""
+    page_blocks = []
+    
+    # Use Tesseract to get text blocks
+    data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+    
+    # Group by block_num to get text blocks
+    blocks = {}
+    n_boxes = len(data['text'])
+    
+    for i in range(n_boxes):
+        block_num = data['block_num'][i]
+        text = data['text'][i].strip()
+        
+        if text and int(data['conf'][i]) > 30:
+            if block_num not in blocks:
+                blocks[block_num] = {
+                    'texts': [],
+                    'x_coords': [],
+                    'y_coords': [],
+                    'widths': [],
+                    'heights': [],
+                    'confidences': []
+                }
+            
+            blocks[block_num]['texts'].append(text)
+            blocks[block_num]['x_coords'].append(data['left'][i])
+            blocks[block_num]['y_coords'].append(data['top'][i])
+            blocks[block_num]['widths'].append(data['width'][i])
+            blocks[block_num]['heights'].append(data['height'][i])
+            blocks[block_num]['confidences'].append(data['conf'][i])
+    
+    # Process each block
+    for block_num, block_data in blocks.items():
+        if block_data['texts']:
+            # Combine all text in the block
+            combined_text = ' '.join(block_data['texts'])
+            
+            # Calculate bounding box for the entire block
+            min_x = min(block_data['x_coords'])
+            min_y = min(block_data['y_coords'])
+            max_x = max([x + w for x, w in zip(block_data['x_coords'], block_data['widths'])])
+            max_y = max([y + h for y, h in zip(block_data['y_coords'], block_data['heights'])])
+            
+            # Average confidence
+            avg_confidence = sum(block_data['confidences']) / len(block_data['confidences'])
+            
+            ocr_result = {
+                "text": combined_text,
+                "bbox": {
+                    "x": min_x,
+                    "y": min_y,
+                    "width": max_x - min_x,
+                    "height": max_y - min_y
+                },
+                "page": page_num,
+                "confidence": int(avg_confidence),
+                "block_id": block_num,
+                "source": "ocr"
+            }
+            
+            page_blocks.append(ocr_result)
+    
+    return page_blocks
+
 def extract_text_with_ocr_blocks(pdf_data):
     """
     Extract text from PDF using Tesseract OCR with block-level detection
@@ -39,76 +144,137 @@ def extract_text_with_ocr_blocks(pdf_data):
     Returns:
         list: Array of text blocks with bounding boxes
     """
+    _ocr_slots.acquire()
     try:
-        images = convert_from_bytes(pdf_data, dpi=150, fmt='PNG')
+        # Rasterize pages in parallel; PPM is uncompressed so pdftoppm skips
+        # the PNG encode/decode round trip without changing the pixels
+        images = convert_from_bytes(pdf_data, dpi=OCR_DPI, fmt='ppm',
+                                    thread_count=OCR_RASTER_THREADS)
         
-        ocr_results = []
-        
-        for page_num, image in enumerate(images, 1):
-            # Use Tesseract to get text blocks
-            data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
-            
-            # Group by block_num to get text blocks
-            blocks = {}
-            n_boxes = len(data['text'])
-            
-            for i in range(n_boxes):
-                block_num = data['block_num'][i]
-                text = data['text'][i].strip()
-                
-                if text and int(data['conf'][i]) > 30:
-                    if block_num not in blocks:
-                        blocks[block_num] = {
-                            'texts': [],
-                            'x_coords': [],
-                            'y_coords': [],
-                            'widths': [],
-                            'heights': [],
-                            'confidences': []
-                        }
-                    
-                    blocks[block_num]['texts'].append(text)
-                    blocks[block_num]['x_coords'].append(data['left'][i])
-                    blocks[block_num]['y_coords'].append(data['top'][i])
-                    blocks[block_num]['widths'].append(data['width'][i])
-                    blocks[block_num]['heights'].append(data['height'][i])
-                    blocks[block_num]['confidences'].append(data['conf'][i])
-            
-            # Process each block
-            for block_num, block_data in blocks.items():
-                if block_data['texts']:
-                    # Combine all text in the block
-                    combined_text = ' '.join(block_data['texts'])
-                    
-                    # Calculate bounding box for the entire block
-                    min_x = min(block_data['x_coords'])
-                    min_y = min(block_data['y_coords'])
-                    max_x = max([x + w for x, w in zip(block_data['x_coords'], block_data['widths'])])
-                    max_y = max([y + h for y, h in zip(block_data['y_coords'], block_data['heights'])])
-                    
-                    # Average confidence
-                    avg_confidence = sum(block_data['confidences']) / len(block_data['confidences'])
-                    
-                    ocr_result = {
-                        "text": combined_text,
-                        "bbox": {
-                            "x": min_x,
-                            "y": min_y,
-                            "width": max_x - min_x,
-                            "height": max_y - min_y
-                        },
-                        "page": page_num,
-                        "confidence": int(avg_confidence),
-                        "block_id": block_num
-                    }
-                    
-                    ocr_results.append(ocr_result)
+        # Tesseract runs as a subprocess per page, so pool threads spend their
+        # time waiting on it and pages are OCR'd in parallel
+        page_results = _page_executor.map(_ocr_page_blocks, range(1, len(images) + 1), images)
+        ocr_results = [block for page_blocks in page_results for block in page_blocks]
         
         return ocr_results
         
-    except Exception as e:
-        print(f"Error during OCR block processing: {e}")
+    except Exception:
+        logger.exception("Error during OCR block processing")
         return []
+    
+    finally:
+        _ocr_slots.release()
+
+def extract_text_layer_blocks(pdf_data) -> Optional[list]:
+    """
+    Read text blocks from the PDF's embedded text layer instead of running OCR
+    
+    Blocks have the same shape as extract_text_with_ocr_blocks, with coordinates
+    scaled from PDF points to OCR_DPI pixels and a confidence of 100.
+    
+    Args:
+        pdf_data: The PDF file content as bytes
+        
+    Returns:
+        list, or None if the document looks scanned (too little embedded text on
+        the sampled pages) or cannot be read, so the caller should fall back to OCR
+    """
+    try:
+        doc = fitz.open(stream=udochat.ensure_bytes(pdf_data), filetype="pdf")
+    except Exception:
+        logger.exception("Error opening PDF to read its text layer")
+        return None
+    
+    try:
+        if doc.needs_pass or doc.page_count == 0:
+            return None
+        
+        for page in doc.pages(0, min(TEXT_LAYER_SAMPLE_PAGES, doc.page_count)):
+            if len(page.get_text("text").strip()) < TEXT_LAYER_MIN_CHARS:
+                return None
+        
+        scale = OCR_DPI / 72
+        text_blocks = []
+        for page_num, page in enumerate(doc, 1):
+            for x0, y0, x1, y1, text, block_num, block_type in page.get_text("blocks"):
+                text = ' '.join(text.split())
+                # block_type 1 is an image block
+                if block_type != 0 or not text:
+                    continue
+                
+                text_blocks.append({
+                    "text": text,
+                    "bbox": {
+                        "x": round(x0 * scale),
+                        "y": round(y0 * scale),
+                        "width": round((x1 - x0) * scale),
+                        "height": round((y1 - y0) * scale)
+                    },
+                    "page": page_num,
+                    "confidence": 100,
+                    "block_id": block_num,
+                    "source": "text_layer"
+                })
+        
+        return text_blocks
+        
+    except Exception:
+        logger.exception("Error reading PDF text layer")
+        return None
+    
+    finally:
+        doc.close()
+
+def ocr_cache_key(pdf_data: bytes) -> str:
+    """Content-addressed cache key for a PDF's OCR blocks"""
+    return f"{hashlib.blake2b(pdf_data, digest_size=16).hexdigest()}:{OCR_CACHE_VERSION}"
+
+def get_ocr_blocks(pdf_data: bytes) -> list:
+    """
+    Return OCR blocks for pdf_data, reusing the result of a previous run on the same bytes
+    
+    Born-digital PDFs are read from their text layer; scanned ones go through
+    Tesseract. Each block's "source" says which was used. Results are kept in a
+    per-process LRU of OCR_CACHE_SIZE entries. Empty results are not cached, since
+    extract_text_with_ocr_blocks also returns [] on failure. Concurrent calls for
+    the same bytes share a single extraction.
+    
+    Args:
+        pdf_data: The PDF file content as bytes
+        
+    Returns:
+        list: Array of text blocks with bounding boxes (see extract_text_with_ocr_blocks)
+    """
+    key = ocr_cache_key(pdf_data)
+    with _ocr_cache_lock:
+        if key in _ocr_cache:
+            _ocr_cache.move_to_end(key)
+            return _ocr_cache[key]
+        
+        pending = _ocr_inflight.get(key)
+        leader = pending is None
+        if leader:
+            pending = _ocr_inflight[key] = {"done": threading.Event(), "result": []}
+    
+    if not leader:
+        pending["done"].wait()
+        return pending["result"]
+    
+    try:
+        ocr_results = extract_text_layer_blocks(pdf_data) or extract_text_with_ocr_blocks(pdf_data)
+        pending["result"] = ocr_results
+        if ocr_results:
+            with _ocr_cache_lock:
+                _ocr_cache[key] = ocr_results
+                _ocr_cache.move_to_end(key)
+                while len(_ocr_cache) > OCR_CACHE_SIZE:
+                    _ocr_cache.popitem(last=False)
+    finally:
+        with _ocr_cache_lock:
+            _ocr_inflight.pop(key, None)
+        pending["done"].set()
+    
+    return ocr_results
 
 def format_ocr_for_prompt(ocr_data: list) -> str:
     """
@@ -124,18 +290,14 @@ def format_ocr_for_prompt(ocr_data: list) -> str:
         return "No text extracted from the document."
     
     # Group by page
-    pages = {}
+    pages = defaultdict(list)
     for item in ocr_data:
-        page = item['page']
-        if page not in pages:
-            pages[page] = []
-        pages[page].append(item)
+        pages[item['page']].append(item)
     
     formatted_text = []
     formatted_text.append("=== EXTRACTED TEXT FROM PLAN DOCUMENTS: USE ONLY FOR REFERENCE NOT COMMENTS ===\n")
     
-    for page_num in sorted(pages.keys()):
-        page_blocks = pages[page_num]
+    for page_num, page_blocks in sorted(pages.items()):
         formatted_text.append(f"PAGE {page_num} ({len(page_blocks)} text blocks):")
         formatted_text.append("-" * 40)
         
@@ -161,13 +323,15 @@ def format_ocr_for_prompt(ocr_data: list) -> str:
     
     return "\n".join(formatted_text)
 
-def submit_plan_to_stormwater_reviewer(pdf_data: bytes, title: str) -> Dict[str, Any]:
+def submit_plan_to_stormwater_reviewer(pdf_data: bytes, title: str, ocr_data: Optional[list] = None) -> Dict[str, Any]:
     """
     Submit a plan (first sheet) to the stormwater reviewer assistant
     
     Args:
         pdf_data: The PDF file content as bytes
         title: The title of the plan
+        ocr_data: Previously extracted blocks for pdf_data; extracted (or taken
+            from the OCR cache) when not given
         
     Returns:
         Dict containing the response and metadata
@@ -182,9 +346,10 @@ def submit_plan_to_stormwater_reviewer(pdf_data: bytes, title: str) -> Dict[str,
             }
         
         # Extract OCR text blocks from the PDF
-        print(f"Extracting OCR data for plan review: {title}")
-        ocr_data = extract_text_with_ocr_blocks(pdf_data)
-        print(f"OCR extraction complete: Found {len(ocr_data)} text blocks")
+        if ocr_data is None:
+            logger.info("Extracting OCR data for plan review: %s", title)
+            ocr_data = get_ocr_blocks(pdf_data)
+            logger.info("OCR extraction complete: Found %d text blocks", len(ocr_data))
         
         # Format OCR data for the prompt
         ocr_text = format_ocr_for_prompt(ocr_data)
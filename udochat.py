@@ -11,12 +11,15 @@ from openai import OpenAI
 from typing import Optional, List, Dict, Any
 from dotenv import load_dotenv
 import time
+import logging
 from PIL import Image
 from io import BytesIO
 import pymupdf as fitz  # PyMuPDF
 
 load_dotenv('.env')
 
+logger = logging.getLogger(__name__)
+
 def ensure_bytes(data):
     if isinstance(data, memoryview):
         return data.tobytes()
@@ -26,10 +29,19 @@ def ensure_bytes(data):
         return data.read()
     return data  # already bytes
 
+_default_client: Optional[OpenAI] = None
+
+def get_default_client() -> OpenAI:
+    """Return a process-wide OpenAI client so its HTTP connection pool is reused across requests"""
+    global _default_client
+    if _default_client is None:
+        _default_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    return _default_client
+
 class OpenAIResponses:
     def __init__(self, api_key: Optional[str] = None):
         """Initialize the OpenAI client for Responses API"""
-        self.client = OpenAI(api_key=api_key or os.getenv('OPENAI_API_KEY'))
+        self.client = OpenAI(api_key=api_key) if api_key else get_default_client()
         self.conversation_history = []
     
     def send_to_responses_api(self, message: str, prompt_id: str, conversation_id: Optional[str] = None, 
@@ -143,7 +155,7 @@ Use an objective, precise, and concise professional drafting review style. Only
             
             # Add file if provided
             if file_data and filename:
-                print(f"📁 Converting PDF to high-resolution PNG quadrants: {filename}")
+                logger.info("Converting PDF to high-resolution PNG quadrants: %s", filename)
                 file_data = file_data.tobytes()
                 quadrant_images = convert_pdf_to_high_res_image(file_data)
                 
@@ -154,7 +166,7 @@ Use an objective, precise, and concise professional drafting review style. Only
                         "type": "input_image", 
                         "image_url": f"data:image/png;base64,{b64_image}",
                     })
-                print(f"✅ {len(quadrant_images)} high-resolution PNG quadrants added to request")
+                logger.info("%d high-resolution PNG quadrants added to request", len(quadrant_images))
             
             # Call the Responses API with the new structure
             response = self.client.responses.create(
@@ -266,7 +278,7 @@ Use an objective, precise, and concise professional drafting review style. Only
             }
             
         except Exception as e:
-            print(f"❌ Error with Responses API: {e}")
+            logger.exception("Error with Responses API")
             return {
                 "status": "error",
                 "response": f"Error: {str(e)}",
@@ -402,12 +414,12 @@ def convert_pdf_to_high_res_image(pdf_bytes):
         
         # Check if document is encrypted or protected
         if doc.needs_pass:
-            print("PDF is password protected, returning original")
+            logger.warning("PDF is password protected, returning original")
             doc.close()
             return [pdf_bytes]
             
         if doc.is_closed:
-            print("PDF document is closed, returning original")
+            logger.warning("PDF document is closed, returning original")
             return [pdf_bytes]
         
         # Get first page (assuming single page for plan review)
@@ -440,17 +452,17 @@ def convert_pdf_to_high_res_image(pdf_bytes):
             buffer = BytesIO()
             quadrant.save(buffer, format='PNG')
             quadrant_bytes.append(buffer.getvalue())
-            print(f"✅ Quadrant {i+1} converted to PNG (size: {len(quadrant_bytes[i])} bytes)")
+            logger.debug("Quadrant %d converted to PNG (size: %d bytes)", i + 1, len(quadrant_bytes[i]))
         
         # Clean up
         pix = None
         doc.close()
         
-        print(f"✅ PDF converted to 4 high-resolution PNG quadrants")
+        logger.info("PDF converted to 4 high-resolution PNG quadrants")
         return quadrant_bytes
         
-    except Exception as e:
-        print(f"Error converting PDF to high-resolution quadrant images: {e}")
+    except Exception:
+        logger.exception("Error converting PDF to high-resolution quadrant images")
         # Return original bytes in a list if conversion fails
         return [pdf_bytes]
 